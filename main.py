@@ -2,9 +2,13 @@
 import sys
 from PySide6.QtWidgets import QApplication
 from src.gui.main_window import WhatsAppBotWindow
+from src.gui.components.web_view import apply_lean_chromium_flags
+from src.utils.constants import LEAN_BROWSER_MODE
 
 def main():
     """Main application entry point"""
+    if LEAN_BROWSER_MODE:
+        apply_lean_chromium_flags()
     app = QApplication(sys.argv)
     window = WhatsAppBotWindow()
     window.show()
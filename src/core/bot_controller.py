@@ -1,65 +1,60 @@
 """WhatsApp Bot Controller for managing bot operations"""
-import os
-import json
+import time
 from PySide6.QtCore import QObject, Signal, QTimer
-from gpt4all import GPT4All
 
-from src.core.message_worker import MessageWorker
+from src.core.inference_engine import InferenceEngine
+from src.core.capture import KIND_MONITOR, KIND_SEND
+from src.core.ingest import MessageIngestor, PAGE_READY
 from src.core.js_injector import get_message_monitor_script, get_message_sender_script
 from src.utils.constants import (
-    MODEL_NAME, MONITOR_INTERVAL, DEFAULT_SYSTEM_PROMPT
+    MONITOR_INTERVAL, DEFAULT_SYSTEM_PROMPT,
+    PRIORITY_CLASSES, DEFAULT_PRIORITY, CONTACT_PRIORITIES
 )
 
 class WhatsAppBotController(QObject):
-    """Controller class to handle all bot-related operations"""
+    """Controller class to handle all bot-related operations for one account"""
     status_signal = Signal(str)
     error_signal = Signal(str, str)  # message, title
     progress_signal = Signal(int)    # For showing generation progress
+    heartbeat_signal = Signal(str, str)  # heartbeat kind, account_id
     
-    def __init__(self, web_view=None):
+    def __init__(self, web_view=None, engine=None, account_id="default", ingestor=None):
         super().__init__()
-        self.model = None
+        self.account_id = account_id
+        self.owns_ingestor = ingestor is None
+        self.ingestor = ingestor if ingestor is not None else MessageIngestor()
+        self.ingestor.ingested.connect(self._on_ingested)
+        self.pending_ingest = 0
+        self.owns_engine = engine is None
+        self.engine = engine if engine is not None else InferenceEngine()
+        self.engine.response_ready.connect(self._on_response_ready)
+        self.engine.progress_signal.connect(self._on_progress)
+        if self.owns_engine:
+            self.engine.status_signal.connect(self.status_signal.emit)
         self.web_view = web_view
         self.is_monitoring = False
-        self.last_processed_message = ""
-        self.message_worker = None
         self.monitor_timer = QTimer()
         self.monitor_timer.timeout.connect(self._execute_message_monitor)
         self.monitor_timer.setInterval(MONITOR_INTERVAL)
         self.system_prompt = DEFAULT_SYSTEM_PROMPT
+        self.priority = DEFAULT_PRIORITY
+        self.recorder = None
+        self.last_sent_text = ""
+        self.awaiting_ack_since = None  # Time of the oldest unconfirmed send
+        
+    @property
+    def model(self):
+        """The shared language model, or None if not initialized"""
+        return self.engine.model
             
     def init_llm(self):
-        """Initialize the language model"""
-        if self.model:  # Reuse existing model if available
-            return True
+        """Initialize the shared language model"""
+        return self.engine.init_llm()
             
-        self.status_signal.emit("Initializing local LLM...")
+    def set_recorder(self, recorder):
+        """Record monitor and send results to a CaptureRecorder, or None to stop"""
+        self.recorder = recorder
         
-        try:
-            self.status_signal.emit(f"Using model: {MODEL_NAME}")
-            
-            if os.path.exists(MODEL_NAME):
-                self.status_signal.emit("Model file found locally.")
-            else:
-                self.status_signal.emit("Model file not found locally. Will download automatically.")
-                self.status_signal.emit("This may take several minutes...")
-            
-            # Initialize model with CPU backend
-            self.model = GPT4All(MODEL_NAME, device='cpu')
-            # Initialize message worker
-            self.message_worker = MessageWorker(self.model)
-            self.message_worker.response_ready.connect(self._send_message)
-            self.message_worker.status_update.connect(self.status_signal.emit)
-            self.message_worker.progress_update.connect(self.progress_signal.emit)
-            
-            self.status_signal.emit(f"LLM initialized successfully!")
-            return True
-            
-        except Exception as e:
-            self.status_signal.emit(f"Error initializing LLM: {str(e)}")
-            self.model = None
-            return False
-            
     def set_web_view(self, web_view):
         """Set the web view for message monitoring"""
         self.web_view = web_view
@@ -81,9 +76,13 @@ class WhatsAppBotController(QObject):
             
         self.status_signal.emit("Starting message monitoring...")
         self.status_signal.emit(f"Target number: {phone_number}")
+        if phone_number in CONTACT_PRIORITIES:
+            self.set_priority(CONTACT_PRIORITIES[phone_number])
         self.status_signal.emit("Please make sure your conversation is open in WhatsApp Web.")
         
         self.is_monitoring = True
+        self.awaiting_ack_since = None
+        self.heartbeat_signal.emit("monitor", self.account_id)
         self._execute_message_monitor()  # Initial check
         self.monitor_timer.start()  # Start periodic checking
         return True
@@ -92,45 +91,55 @@ class WhatsAppBotController(QObject):
         """Stop monitoring messages"""
         self.is_monitoring = False
         self.monitor_timer.stop()
-        if self.message_worker and self.message_worker.isRunning():
-            self.message_worker.wait()  # Wait for current processing to finish
         self.status_signal.emit("Bot stopped")
             
     def cleanup(self):
         """Clean up resources"""
         self.stop_monitoring()
-        if self.message_worker:
-            self.message_worker.quit()
-            self.message_worker.wait()
+        if self.owns_engine:
+            self.engine.cleanup()
+        if self.owns_ingestor:
+            self.ingestor.stop()
         
     def process_messages(self, result):
-        """Process messages from the message monitor"""
-        try:
-            data = json.loads(result)
-            
-            if data.get('status') != 'success' or not data.get('messages'):
-                return
-                
-            messages = data['messages']
-            last_message = messages[-1]
-            
-            # Only process if it's a new incoming message
-            if (not last_message['isOutgoing'] and 
-                last_message['text'] != self.last_processed_message):
-                
-                self.status_signal.emit(f"New message: '{last_message['text'][:30]}...'")
-                self.last_processed_message = last_message['text']
-                
-                # Only use the last message for faster response
-                conversation = f"User: {last_message['text']}"
-                
-                # Process in worker thread if not already processing
-                if self.message_worker and not self.message_worker.is_processing:
-                    self.progress_signal.emit(0)  # Reset progress
-                    self.message_worker.set_conversation(conversation, self.system_prompt)
-                
-        except Exception as e:
-            self.status_signal.emit(f"Error processing messages: {str(e)}")
+        """Hand a monitor result to the ingest thread for parsing and filtering"""
+        self.pending_ingest += 1
+        self.ingestor.submit(self.account_id, result)
+        
+    def _on_ingested(self, account_id, text, error, page_state, outgoing):
+        """Queue a reply for a new message found by the ingest thread"""
+        if account_id != self.account_id:
+            return
+        self.pending_ingest -= 1
+        
+        if page_state == PAGE_READY:
+            self.heartbeat_signal.emit("monitor", self.account_id)
+        elif page_state:
+            # Logged out or still loading, tells the watchdog not to reload
+            self.heartbeat_signal.emit(page_state, self.account_id)
+        if self.awaiting_ack_since is not None and _same_message(outgoing, self.last_sent_text):
+            # The sent reply now shows up as the latest outgoing message
+            self.awaiting_ack_since = None
+            self.heartbeat_signal.emit("send", self.account_id)
+            
+        if not self.is_monitoring:
+            # Stopped while this result was still queued on the ingest thread
+            return
+        if error:
+            self.status_signal.emit(f"Error processing messages: {error}")
+            return
+        if not text:
+            return
+            
+        self.status_signal.emit(f"New message: '{text[:30]}...'")
+        
+        # Only use the last message for faster response
+        conversation = f"User: {text}"
+        
+        # Queue on the shared worker, which serves jobs earliest-deadline-first
+        if self.engine.submit(self.account_id, conversation, self.system_prompt,
+                              self.priority):
+            self.progress_signal.emit(0)  # Reset progress
             
     def _execute_message_monitor(self):
         """Execute the message monitoring logic"""
@@ -141,11 +150,29 @@ class WhatsAppBotController(QObject):
             self.web_view.page().runJavaScript(
                 get_message_monitor_script(),
                 0,
-                lambda result: self.process_messages(result) if result else None
+                self._on_monitor_result
             )
         except Exception as e:
             self.status_signal.emit(f"Error in message monitoring: {str(e)}")
             
+    def _on_monitor_result(self, result):
+        """Record a monitor-script result and process it"""
+        if not result:
+            return
+        if self.recorder:
+            self.recorder.record(KIND_MONITOR, self.account_id, result)
+        self.process_messages(result)
+            
+    def _on_response_ready(self, account_id, response):
+        """Send responses generated for this account"""
+        if account_id == self.account_id:
+            self._send_message(response)
+            
+    def _on_progress(self, account_id, progress):
+        """Forward generation progress for this account"""
+        if account_id == self.account_id:
+            self.progress_signal.emit(progress)
+            
     def _send_message(self, response):
         """Send message in a non-blocking way"""
         if not response or not self.web_view:
@@ -156,8 +183,14 @@ class WhatsAppBotController(QObject):
             response = response[len("assistant:"):].strip()
             
         self.status_signal.emit(f"Sending response: {response[:30]}...")
+        self.last_sent_text = response
+        if self.awaiting_ack_since is None:
+            self.awaiting_ack_since = time.time()
         
         def send_callback(result):
+            if self.recorder:
+                self.recorder.record(KIND_SEND, self.account_id,
+                                     {"response": response, "result": result})
             try:
                 if not result:
                     self.status_signal.emit("No result from message send attempt")
@@ -188,6 +221,33 @@ class WhatsAppBotController(QObject):
             self.system_prompt = prompt.strip()
         self.status_signal.emit("System prompt updated")
         
+    def reload_page(self):
+        """Reload WhatsApp Web to recover a stalled or logged-out page"""
+        if not self.web_view:
+            return
+        self.status_signal.emit("Reloading WhatsApp Web...")
+        self.awaiting_ack_since = None
+        self.web_view.reload()
+        
+    def set_priority(self, priority):
+        """Set the priority class used for this account's replies"""
+        if priority not in PRIORITY_CLASSES:
+            self.error_signal.emit(f"Unknown priority class: {priority}", "Invalid Priority")
+            return
+        self.priority = priority
+        deadline = PRIORITY_CLASSES[priority]["deadline"]
+        self.status_signal.emit(f"Priority set to {priority} (reply deadline {deadline}s)")
+        
     def get_system_prompt(self):
         """Get current system prompt"""
-        return self.system_prompt 
\ No newline at end of file
+        return self.system_prompt 
+
+def _same_message(shown, sent):
+    """Return True if a message shown in the chat matches a sent reply"""
+    shown = " ".join(shown.split())
+    sent = " ".join(sent.split())
+    if not shown or not sent:
+        return False
+    # WhatsApp may render emoji and long text differently, compare a prefix
+    prefix = min(len(shown), len(sent), 40)
+    return shown[:prefix] == sent[:prefix]
@@ -0,0 +1,87 @@
+"""Recording of monitor and send results to compressed JSONL captures"""
+import gzip
+import json
+import os
+import time
+import zlib
+
+from src.utils.constants import CAPTURE_FLUSH_INTERVAL
+
+# Record kinds written to a capture
+KIND_MONITOR = "monitor"
+KIND_SEND = "send"
+
+def session_capture_path(path, now=None):
+    """Add a session timestamp to a capture path, before its extension"""
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    base, ext = path, ""
+    for suffix in (".jsonl.gz", ".gz"):
+        if path.endswith(suffix):
+            base, ext = path[:-len(suffix)], suffix
+            break
+    return f"{base}-{stamp}{ext}"
+
+class CaptureRecorder:
+    """Writes monitor-script and send results to a gzip-compressed JSONL file.
+
+    Every session gets a new file so a replay never spans the idle time
+    between sessions, and the stream is flushed periodically so the file is
+    readable up to the last flush if the bot is killed.
+    """
+
+    def __init__(self, path):
+        self.path = session_capture_path(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        self.count = 0
+        self.last_flush = time.time()
+
+    def record(self, kind, account_id, data):
+        """Write one timestamped record"""
+        if self.file is None:
+            return
+        line = json.dumps({
+            "t": time.time(),
+            "kind": kind,
+            "account": account_id,
+            "data": data,
+        }, ensure_ascii=False)
+        self.file.write(line + "\n")
+        self.count += 1
+        if time.time() - self.last_flush >= CAPTURE_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Make everything recorded so far readable without closing the file"""
+        if self.file is not None:
+            self.file.flush()
+            self.last_flush = time.time()
+
+    def close(self):
+        """Flush and close the capture file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def read_capture(path):
+    """Yield the records of a capture file in order.
+
+    A capture that was not closed (the bot crashed or was killed) ends in a
+    truncated gzip stream; reading stops cleanly at the last complete record.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as capture_file:
+        try:
+            for line in capture_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Only the last line of a truncated capture can be cut off
+                    return
+                yield record
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            return
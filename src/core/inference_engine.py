@@ -0,0 +1,219 @@
+"""Shared inference engine used by every WhatsApp account"""
+import os
+import time
+from PySide6.QtCore import QObject, QThread, Signal
+from gpt4all import GPT4All
+
+from src.core.message_worker import MessageWorker
+from src.core.scheduler import LatencyStats, format_metrics
+from src.utils.constants import (
+    MODEL_NAME, DEFAULT_PRIORITY, STREAMING_SEND, WORKER_JOIN_TIMEOUT
+)
+
+class ModelLoader(QThread):
+    """Loads a model off the GUI thread"""
+    loaded = Signal(object)  # The loaded model
+    failed = Signal(str)     # Error message
+    
+    def __init__(self, model_name):
+        super().__init__()
+        self.model_name = model_name
+        
+    def run(self):
+        try:
+            model = GPT4All(self.model_name, device='cpu')
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(model)
+
+class InferenceEngine(QObject):
+    """Owns the single LLM instance and the worker queue shared by all accounts"""
+    status_signal = Signal(str)
+    response_ready = Signal(str, str)   # account_id, response
+    progress_signal = Signal(str, int)  # account_id, progress (0-100)
+    metrics_signal = Signal(dict)       # Per-priority-class latency metrics
+    
+    def __init__(self):
+        super().__init__()
+        self.model = None
+        self.message_worker = None
+        self.streaming_send = STREAMING_SEND
+        # Replaced workers that may still be stuck, kept until their threads finish
+        self.abandoned_workers = []
+        self.model_loader = None
+        
+    def is_ready(self):
+        """Return True once the model is loaded"""
+        return self.model is not None
+        
+    def init_llm(self):
+        """Initialize the language model"""
+        if self.model:  # Reuse existing model if available
+            return True
+            
+        self.status_signal.emit("Initializing local LLM...")
+        
+        try:
+            self.status_signal.emit(f"Using model: {MODEL_NAME}")
+            
+            if os.path.exists(MODEL_NAME):
+                self.status_signal.emit("Model file found locally.")
+            else:
+                self.status_signal.emit("Model file not found locally. Will download automatically.")
+                self.status_signal.emit("This may take several minutes...")
+            
+            # Initialize model with CPU backend
+            self.use_model(GPT4All(MODEL_NAME, device='cpu'))
+            self.status_signal.emit(f"Prompt template: {self.message_worker.prompt_template.name}")
+            
+            self.status_signal.emit(f"LLM initialized successfully!")
+            return True
+            
+        except Exception as e:
+            self.status_signal.emit(f"Error initializing LLM: {str(e)}")
+            self.model = None
+            return False
+            
+    def use_model(self, model):
+        """Serve replies from an already loaded model"""
+        self.model = model
+        # Initialize message worker
+        self.message_worker = MessageWorker(self.model)
+        self.message_worker.streaming_send = self.streaming_send
+        self.message_worker.response_ready.connect(self.response_ready.emit)
+        self.message_worker.status_update.connect(self.status_signal.emit)
+        self.message_worker.progress_update.connect(self.progress_signal.emit)
+        self.message_worker.metrics_update.connect(self.metrics_signal.emit)
+        
+    def worker_busy_since(self):
+        """Return when the current job started, or None if the worker is idle"""
+        if self.is_idle():
+            return None
+        return self.message_worker.job_started_at or time.time()
+        
+    def restart_worker(self):
+        """Cancel the job in progress and make sure the worker loop is running"""
+        if not self.message_worker:
+            return
+        self.status_signal.emit("Restarting message worker...")
+        self.message_worker.cancel_current()
+        if not self.message_worker.isRunning():
+            self.message_worker.is_stopping = False
+            self.message_worker.start()
+            
+    def reload_model(self):
+        """Load a fresh model in the background, then swap it in for the current one.
+        
+        The current model and worker keep serving until the new model is
+        loaded, and stay in place if loading fails.
+        """
+        if self.model_loader is not None:
+            return
+        self.status_signal.emit("Reloading language model...")
+        self.model_loader = ModelLoader(MODEL_NAME)
+        self.model_loader.loaded.connect(self._on_model_reloaded)
+        self.model_loader.failed.connect(self._on_model_reload_failed)
+        self.model_loader.start()
+        
+    def _on_model_reloaded(self, model):
+        """Replace the worker with one on the new model, carrying over queued jobs"""
+        self._finish_reload()
+        old_worker = self.message_worker
+        pending = []
+        if old_worker:
+            old_worker.abandoned = True
+            old_worker.stop()
+            old_worker.cancel_current()
+            for signal in (old_worker.response_ready, old_worker.status_update,
+                           old_worker.progress_update, old_worker.metrics_update):
+                signal.disconnect()
+            pending = old_worker.take_pending()
+            if old_worker.current_job is not None:
+                # Retry the job the stuck model was working on
+                pending.append(old_worker.current_job)
+            # The old model is freed once its worker thread has finished
+            old_worker.finished.connect(self._reap_workers)
+            self.abandoned_workers.append(old_worker)
+            self._reap_workers()
+            
+        self.use_model(model)
+        if old_worker:
+            with old_worker.job_available:
+                self.message_worker.latency_stats = old_worker.latency_stats
+                old_worker.latency_stats = LatencyStats()
+        self.message_worker.adopt(pending)
+        self.status_signal.emit("Language model reloaded")
+        
+    def _on_model_reload_failed(self, error):
+        """Keep serving from the current model"""
+        self._finish_reload()
+        self.status_signal.emit(f"Error reloading LLM, keeping current model: {error}")
+        
+    def _finish_reload(self):
+        """Release the finished model loader thread"""
+        if self.model_loader is not None:
+            self.model_loader.wait()
+            self.model_loader = None
+        
+    def _reap_workers(self):
+        """Drop replaced workers whose threads have finished"""
+        running = []
+        for worker in self.abandoned_workers:
+            if worker.isRunning():
+                running.append(worker)
+            else:
+                worker.model = None
+        self.abandoned_workers = running
+        
+    def set_streaming_send(self, enabled):
+        """Send each complete sentence as soon as it is generated"""
+        self.streaming_send = enabled
+        if self.message_worker:
+            self.message_worker.streaming_send = enabled
+        
+    def is_idle(self):
+        """Return True when no reply job is queued or being generated"""
+        if not self.message_worker:
+            return True
+        return (not self.message_worker.is_processing and
+                self.message_worker.pending_count() == 0)
+        
+    def submit(self, account_id, conversation, system_prompt,
+               priority=DEFAULT_PRIORITY, deadline=None):
+        """Queue a reply job for an account, returns False if the model is not ready"""
+        if not self.message_worker:
+            return False
+        self.message_worker.submit(account_id, conversation, system_prompt, priority, deadline)
+        return True
+        
+    def get_metrics(self):
+        """Return per-priority-class latency metrics"""
+        if not self.message_worker:
+            return {}
+        return self.message_worker.get_metrics()
+        
+    def format_metrics(self):
+        """Return per-priority-class latency metrics as log lines"""
+        return format_metrics(self.get_metrics())
+        
+    def cleanup(self):
+        """Stop the current and replaced worker threads, giving each a bounded join"""
+        if self.model_loader is not None:
+            self.model_loader.wait()
+            self.model_loader = None
+        workers = self.abandoned_workers
+        if self.message_worker:
+            workers = [self.message_worker] + workers
+        for worker in workers:
+            worker.stop()
+            if worker.wait(WORKER_JOIN_TIMEOUT):
+                continue
+            # Give up on the reply being generated
+            worker.abandoned = True
+            worker.cancel_current()
+            if not worker.wait(WORKER_JOIN_TIMEOUT):
+                # Stuck inside the model, it cannot be stopped cooperatively
+                worker.terminate()
+                worker.wait()
+        self.abandoned_workers = []
@@ -0,0 +1,94 @@
+"""Off-GUI-thread ingestion of message monitor results"""
+import json
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+from src.utils.constants import INGEST_MAX_MESSAGE_LENGTH
+
+# Page states reported with every ingested result
+PAGE_READY = "ready"      # Logged in, chat list shown
+PAGE_LOGIN = "login"      # Logged out, QR code shown
+PAGE_LOADING = "loading"  # Starting up or syncing chats
+
+def parse_monitor_result(result):
+    """Parse and validate a monitor-script result.
+
+    Returns (page_state, messages) where page_state is one of PAGE_READY,
+    PAGE_LOGIN or PAGE_LOADING, and messages is the list of valid messages.
+    Raises ValueError if the result is malformed.
+    """
+    data = json.loads(result) if isinstance(result, str) else result
+    if not isinstance(data, dict):
+        raise ValueError("Monitor result is not an object")
+    # Captures recorded before loggedIn was reported only have the status
+    if data.get('loggedIn', data.get('status') == 'success'):
+        page_state = PAGE_READY
+    elif data.get('loginRequired'):
+        page_state = PAGE_LOGIN
+    else:
+        page_state = PAGE_LOADING
+    if data.get('status') != 'success':
+        return page_state, []
+
+    messages = []
+    for message in data.get('messages') or []:
+        if not isinstance(message, dict):
+            continue
+        text = message.get('text')
+        if not isinstance(text, str) or not text.strip():
+            continue
+        messages.append({
+            'text': text.strip()[:INGEST_MAX_MESSAGE_LENGTH],
+            'isOutgoing': bool(message.get('isOutgoing')),
+        })
+    return page_state, messages
+
+class MessageIngestor(QObject):
+    """Parses, validates, dedupes and routes monitor results on its own thread.
+
+    Results are handed in with submit() from the GUI thread. For every result
+    one compact ingested(account_id, text, error, page_state, outgoing) event
+    is emitted back, where text is the new incoming message to reply to (empty
+    if there is none), page_state is one of the PAGE_* states (empty if the
+    result could not be parsed) and outgoing is the latest outgoing message,
+    used to confirm sends.
+    """
+    ingested = Signal(str, str, str, str, str)  # account_id, text, error, page_state, outgoing
+    submit_requested = Signal(str, object)  # account_id, raw monitor result
+
+    def __init__(self):
+        super().__init__()
+        self.last_processed = {}  # account_id -> last replied-to message text
+        self.ingest_thread = QThread()
+        self.ingest_thread.setObjectName("MessageIngestor")
+        self.moveToThread(self.ingest_thread)
+        self.submit_requested.connect(self._ingest)
+        self.ingest_thread.start()
+
+    def submit(self, account_id, result):
+        """Queue a raw monitor result for processing"""
+        self.submit_requested.emit(account_id, result)
+
+    @Slot(str, object)
+    def _ingest(self, account_id, result):
+        """Process one result on the ingest thread"""
+        try:
+            page_state, messages = parse_monitor_result(result)
+        except Exception as e:
+            self.ingested.emit(account_id, "", str(e), "", "")
+            return
+
+        text = ""
+        outgoing = next((m['text'] for m in reversed(messages) if m['isOutgoing']), "")
+        if messages:
+            last_message = messages[-1]
+            # Only route new incoming messages
+            if (not last_message['isOutgoing'] and
+                    last_message['text'] != self.last_processed.get(account_id)):
+                self.last_processed[account_id] = last_message['text']
+                text = last_message['text']
+        self.ingested.emit(account_id, text, "", page_state, outgoing)
+
+    def stop(self):
+        """Stop the ingest thread"""
+        self.ingest_thread.quit()
+        self.ingest_thread.wait()
@@ -12,6 +12,8 @@ def get_message_monitor_script():
                 return JSON.stringify({
                     status: 'waiting',
                     error: 'WhatsApp not fully loaded',
+                    loggedIn: false,
+                    loginRequired: false,
                     messages: []
                 });
             }
@@ -66,6 +68,10 @@ def get_message_monitor_script():
             return JSON.stringify({
                 status: messages.length > 0 ? 'success' : 'waiting',
                 error: messages.length === 0 ? 'No messages found' : '',
+                // The chat list pane only exists once the session is logged in
+                loggedIn: !!document.querySelector('#pane-side'),
+                // The link-a-device QR code is only shown while logged out
+                loginRequired: !!document.querySelector('div[data-ref], canvas[aria-label]'),
                 messages: messages
             });
         } catch (error) {
@@ -269,6 +275,8 @@ def get_message_sender_script(message):
             }}
         }}
         
-        return sendMessage();
+        // Chain sends so streamed sentences are typed one after another
+        window.__botSendChain = (window.__botSendChain || Promise.resolve()).then(sendMessage);
+        return window.__botSendChain;
     }})();
     """ 
\ No newline at end of file
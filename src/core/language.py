@@ -0,0 +1,83 @@
+"""Cheap language detection for picking a localized system prompt"""
+import re
+
+from src.utils.constants import DEFAULT_SYSTEM_PROMPT, LOCALIZED_SYSTEM_PROMPTS
+
+LANGUAGE_NAMES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German",
+    "pt": "Portuguese", "it": "Italian", "ur": "Urdu", "ar": "Arabic",
+    "hi": "Hindi", "ru": "Russian", "zh": "Chinese", "ja": "Japanese",
+    "ko": "Korean", "tr": "Turkish", "id": "Indonesian",
+    "ur-Latn": "Roman Urdu (Urdu written in Latin letters)",
+}
+
+# Letters used by Urdu but not Arabic
+URDU_LETTERS = set("ٹڈڑںےھہۓگکچپژ")
+
+# Unicode ranges of scripts that identify a language on their own
+SCRIPT_RANGES = [
+    ("hi", 0x0900, 0x097F),   # Devanagari
+    ("ru", 0x0400, 0x04FF),   # Cyrillic
+    ("ja", 0x3040, 0x30FF),   # Hiragana and Katakana, checked before Han
+    ("ko", 0xAC00, 0xD7AF),   # Hangul
+    ("zh", 0x4E00, 0x9FFF),   # Han
+]
+
+# Frequent short words for Latin-script languages, including romanized Urdu
+STOPWORDS = {
+    "en": {"the", "is", "are", "you", "and", "what", "how", "can", "please", "thanks", "hello"},
+    "es": {"el", "la", "que", "es", "y", "los", "por", "hola", "gracias", "cómo", "qué", "para"},
+    "fr": {"le", "la", "les", "est", "et", "je", "vous", "bonjour", "merci", "pour", "pas", "une"},
+    "de": {"der", "die", "das", "ist", "und", "ich", "nicht", "sie", "danke", "hallo", "wie", "ein"},
+    "pt": {"o", "os", "que", "é", "e", "não", "obrigado", "olá", "você", "como", "um", "uma"},
+    "it": {"il", "che", "è", "e", "non", "ciao", "grazie", "sono", "come", "per", "una", "della"},
+    "tr": {"bir", "ve", "bu", "ne", "merhaba", "teşekkürler", "nasıl", "için", "değil", "evet"},
+    "id": {"yang", "dan", "ini", "itu", "tidak", "apa", "saya", "terima", "kasih", "halo"},
+    "ur-Latn": {"hai", "hain", "kya", "nahi", "aap", "mein", "main", "ka", "ki", "ko", "kaise", "shukriya"},
+}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def detect_language(text):
+    """Return a language code for text, or None if it cannot be told cheaply"""
+    if not text:
+        return None
+
+    script_counts = {}
+    arabic_letters = 0
+    urdu_letters = 0
+    for char in text:
+        code = ord(char)
+        if 0x0600 <= code <= 0x06FF:
+            arabic_letters += 1
+            if char in URDU_LETTERS:
+                urdu_letters += 1
+            continue
+        for language, start, end in SCRIPT_RANGES:
+            if start <= code <= end:
+                script_counts[language] = script_counts.get(language, 0) + 1
+                break
+
+    if arabic_letters:
+        script_counts["ur" if urdu_letters else "ar"] = arabic_letters
+    if script_counts:
+        return max(script_counts, key=script_counts.get)
+
+    words = [w.lower() for w in WORD_PATTERN.findall(text)]
+    if not words:
+        return None
+    scores = {language: sum(1 for w in words if w in stopwords)
+              for language, stopwords in STOPWORDS.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else None
+
+def localize_system_prompt(system_prompt, language):
+    """Pick the localized default prompt, or ask a custom prompt to reply in the language"""
+    if not language or language == "en":
+        return system_prompt
+    if system_prompt == DEFAULT_SYSTEM_PROMPT and language in LOCALIZED_SYSTEM_PROMPTS:
+        return LOCALIZED_SYSTEM_PROMPTS[language]
+    name = LANGUAGE_NAMES.get(language)
+    if not name:
+        return system_prompt
+    return f"{system_prompt}\nReply in {name}."
@@ -1,86 +1,253 @@
 import time
+import threading
 from PySide6.QtCore import QThread, Signal
-from gpt4all import GPT4All
+
+from src.core.streaming import SentenceStreamer
+from src.core.prompt_templates import get_template
+from src.core.language import detect_language, localize_system_prompt
+from src.core.scheduler import (
+    ReplyJob, DeadlineScheduler, LatencyStats,
+    OUTCOME_LLM, OUTCOME_FAST_PATH, OUTCOME_CANNED
+)
+from src.utils.constants import (
+    DEFAULT_PRIORITY, MESSAGE_TIMEOUT, FAST_PATH_SLACK, FAST_PATH_MAX_TOKENS, CANNED_REPLY,
+    STREAMING_SEND, MODEL_NAME
+)
 
 class MessageWorker(QThread):
-    """Worker thread for handling message processing and LLM operations"""
-    response_ready = Signal(str)  # Emits when response is generated
-    status_update = Signal(str)   # Emits status updates
-    progress_update = Signal(int) # Emits progress updates (0-100)
+    """Worker thread that serves queued reply jobs for all accounts from one model"""
+    response_ready = Signal(str, str)    # account_id, response
+    status_update = Signal(str)          # Emits status updates
+    progress_update = Signal(str, int)   # account_id, progress (0-100)
+    metrics_update = Signal(dict)        # Per-priority-class latency metrics
     
-    def __init__(self, model):
+    def __init__(self, model, prompt_template=None):
         super().__init__()
         self.model = model
-        self.conversation = None
+        self.prompt_template = prompt_template or get_template(MODEL_NAME)
         self.is_processing = False
         self.token_count = 0
         self.max_tokens = 50  # Reduced from 100 for faster responses
-        self.system_prompt = None
+        self.is_stopping = False
+        self.streaming_send = STREAMING_SEND
+        self.first_reply_at = None
+        self.job_started_at = None
+        self.current_job = None
+        self.cancel_requested = False
+        self.abandoned = False  # Replaced by another worker, results are discarded
         
-    def set_conversation(self, conversation, system_prompt):
-        """Set conversation to process"""
-        if self.is_processing:
-            return
-        self.conversation = conversation
-        self.system_prompt = system_prompt
-        self.token_count = 0
+        # Jobs are served earliest-deadline-first; the per-account cap keeps
+        # one busy account from crowding out the others
+        self.scheduler = DeadlineScheduler()
+        self.latency_stats = LatencyStats()
+        self.job_available = threading.Condition()
+        
+    def submit(self, account_id, conversation, system_prompt,
+               priority=DEFAULT_PRIORITY, deadline=None):
+        """Queue a conversation for the given account"""
+        job = ReplyJob(account_id, conversation, system_prompt, priority, deadline)
+        with self.job_available:
+            self._push(job)
+            self.job_available.notify()
+            
         if not self.isRunning():
+            self.is_stopping = False
+            self.start()
+            
+    def _push(self, job):
+        """Queue a job, counting the one it displaces; caller holds job_available"""
+        dropped = self.scheduler.push(job)
+        if dropped is not None:
+            self.latency_stats.record_dropped(dropped.priority)
+            
+    def pending_count(self, account_id=None):
+        """Return the number of queued jobs, optionally for one account"""
+        with self.job_available:
+            return self.scheduler.pending_count(account_id)
+            
+    def get_metrics(self):
+        """Return per-priority-class latency metrics"""
+        with self.job_available:
+            return self.latency_stats.snapshot()
+            
+    def cancel_current(self):
+        """Abandon the job being generated at the next token"""
+        self.cancel_requested = True
+        
+    def take_pending(self):
+        """Remove and return all queued jobs"""
+        with self.job_available:
+            jobs = list(iter(self.scheduler.pop, None))
+        return jobs
+        
+    def adopt(self, jobs):
+        """Queue jobs taken from another worker, keeping their deadlines"""
+        with self.job_available:
+            for job in jobs:
+                self._push(job)
+            self.job_available.notify()
+        if jobs and not self.isRunning():
+            self.is_stopping = False
             self.start()
             
+    def stop(self):
+        """Ask the worker loop to exit after the current job"""
+        with self.job_available:
+            self.is_stopping = True
+            self.job_available.notify_all()
+            
+    def _next_job(self):
+        """Block until a job is available and return it, or None when stopping"""
+        with self.job_available:
+            while not self.is_stopping and not len(self.scheduler):
+                self.job_available.wait()
+            if self.is_stopping:
+                return None
+            # Mark busy before releasing the lock so the job is never invisible
+            self.is_processing = True
+            self.job_started_at = time.time()
+            self.cancel_requested = False
+            self.current_job = self.scheduler.pop()
+            return self.current_job
+            
     def run(self):
-        """Process conversation and generate response"""
-        if not self.conversation or not self.model or self.is_processing:
+        """Serve queued jobs until stopped"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            try:
+                self._process_job(job)
+            finally:
+                self.is_processing = False
+                self.current_job = None
+            
+    def _process_job(self, job):
+        """Reply to a job, degrading to a fast path or canned reply near its deadline"""
+        self.first_reply_at = None
+        slack = job.slack()
+        if slack <= 0:
+            # Already late, a canned reply now beats an LLM reply later
+            self.status_update.emit(f"Deadline missed for {job.priority} message, sending canned reply")
+            self._finish(job, CANNED_REPLY, OUTCOME_CANNED)
             return
             
+        outcome = OUTCOME_LLM
+        max_tokens = self.max_tokens
+        if slack < FAST_PATH_SLACK:
+            outcome = OUTCOME_FAST_PATH
+            max_tokens = FAST_PATH_MAX_TOKENS
+            
+        streamer = SentenceStreamer() if self.streaming_send else None
+        response, timed_out = self._generate(job, max_tokens, min(MESSAGE_TIMEOUT, slack), streamer)
+        if self.cancel_requested:
+            if self.first_reply_at is None:
+                self._finish(job, CANNED_REPLY, OUTCOME_CANNED)
+            return
+        if streamer and timed_out and self.first_reply_at is not None:
+            # The tail was cut mid-sentence, only the sentences already sent stand
+            response = ""
+            
+        if self.first_reply_at is None and job.slack() <= 0:
+            self.status_update.emit(f"Deadline reached while generating {job.priority} reply, sending canned reply")
+            self._finish(job, CANNED_REPLY, OUTCOME_CANNED)
+        elif response or self.first_reply_at is not None:
+            self._finish(job, response, outcome)
+        elif timed_out:
+            self._finish(job, CANNED_REPLY, OUTCOME_CANNED)
+            
+    def _send_part(self, job, text):
+        """Emit one message of a reply, noting when the first one went out"""
+        if self.abandoned:
+            return
+        if self.first_reply_at is None:
+            self.first_reply_at = time.time()
+        self.response_ready.emit(job.account_id, text)
+            
+    def _finish(self, job, response, outcome):
+        """Emit the rest of the reply and record its latency"""
+        if self.abandoned:
+            # The job was handed to the replacing worker
+            return
+        if response:
+            self._send_part(job, response)
+        latency = time.time() - job.enqueued_at
+        first_latency = self.first_reply_at - job.enqueued_at
+        self.progress_update.emit(job.account_id, 100)
+        with self.job_available:
+            self.latency_stats.record(job.priority, latency, outcome,
+                                      missed=job.slack() <= 0, first_latency=first_latency)
+            metrics = self.latency_stats.snapshot()
+        self.metrics_update.emit(metrics)
+        
+    def build_prompt(self, system_prompt, user_message):
+        """Render the model's prompt with a system prompt in the user's language"""
+        language = detect_language(user_message)
+        system_prompt = localize_system_prompt(system_prompt, language)
+        return self.prompt_template.render(system_prompt, user_message)
+        
+    def _generate(self, job, max_tokens, time_limit, streamer=None):
+        """Generate a response within the token and time limits.
+
+        With a streamer, each complete sentence is sent as soon as it is
+        generated and only the unsent remainder is returned. Returns the
+        response and whether generation timed out.
+        """
+        if not job.conversation or not self.model:
+            return "", False
+            
+        timed_out = False
         try:
-            self.is_processing = True
+            self.token_count = 0
             self.status_update.emit("Generating response...")
-            self.progress_update.emit(0)
+            self.progress_update.emit(job.account_id, 0)
             
             full_response = ""
             start_time = time.time()
-            
-            # Use provided system prompt
-            prompt = f"""<|im_start|>system
-{self.system_prompt}
-<|im_start|>user
-{self.conversation.split('\n')[-1]}
-<|im_start|>assistant
-"""
+            last_line = job.conversation.split('\n')[-1]
+            if last_line.startswith("User: "):
+                last_line = last_line[len("User: "):]
+            prompt = self.build_prompt(job.system_prompt, last_line)
+            template = self.prompt_template
             
             for token in self.model.generate(
                 prompt=prompt,
-                max_tokens=self.max_tokens,
+                max_tokens=max_tokens,
                 temp=0.7,
                 top_k=20,
                 top_p=0.85,
                 repeat_penalty=1.1,
                 streaming=True
             ):
-                if time.time() - start_time > 15:  # 15 second timeout
+                if time.time() - start_time > time_limit:
                     self.status_update.emit("Response generation timed out")
+                    timed_out = True
                     break
+                if self.cancel_requested:
+                    self.status_update.emit("Response generation cancelled")
+                    return "", True
                     
                 full_response += token
                 self.token_count += 1
                 # Update progress based on token count
-                progress = min(100, int((self.token_count / self.max_tokens) * 100))
-                self.progress_update.emit(progress)
+                progress = min(100, int((self.token_count / max_tokens) * 100))
+                self.progress_update.emit(job.account_id, progress)
                 
-            if full_response:
-                # Extract only the assistant's response
-                response = full_response.strip()
-                if "<|im_start|>" in response:
-                    response = response.split("<|im_start|>assistant")[-1].strip()
-                if "<|im_end|>" in response:
-                    response = response.split("<|im_end|>")[0].strip()
-                    
-                self.response_ready.emit(response)
-                self.progress_update.emit(100)
+                stopped = template.find_stop(full_response) >= 0
+                if streamer:
+                    visible = template.clean(full_response, final=stopped)
+                    for sentence in streamer.update(visible):
+                        self._send_part(job, sentence)
+                if stopped:
+                    break
+                
+            response = template.clean(full_response)
+            if streamer:
+                response = streamer.flush(response)
+            return response.strip(), timed_out
                 
         except Exception as e:
             self.status_update.emit(f"Error generating response: {str(e)}")
+            return "", timed_out
         finally:
-            self.is_processing = False
-            self.conversation = None
-            self.token_count = 0 
\ No newline at end of file
+            self.token_count = 0
@@ -0,0 +1,90 @@
+"""Benchmark of tokens generated per reply with the legacy and the templated prompt
+
+Runs the same messages through the hand-built ChatML prompt the bot used
+before prompt templates, and through the model's own template with stop
+tokens and a localized system prompt, then prints the average number of
+tokens generated and the average time per reply.
+
+Usage:
+    python -m src.core.prompt_benchmark --runs 3
+"""
+import argparse
+import sys
+import time
+from gpt4all import GPT4All
+
+from src.core.language import detect_language, localize_system_prompt
+from src.core.prompt_templates import get_template
+from src.utils.constants import (
+    MODEL_NAME, MAX_TOKENS, TEMPERATURE, TOP_K, TOP_P, REPEAT_PENALTY, DEFAULT_SYSTEM_PROMPT
+)
+
+SAMPLE_MESSAGES = [
+    "Hi, are you open today?",
+    "Can you send me the price list please?",
+    "Thanks, that was helpful!",
+    "Hola, ¿a qué hora cierran hoy?",
+    "Bonjour, est-ce que la livraison est gratuite ?",
+    "Hallo, ist meine Bestellung schon unterwegs?",
+    "kya aap ka order aaj deliver ho jaye ga?",
+    "السلام علیکم، آپ کی دکان کب کھلتی ہے؟",
+]
+
+def legacy_prompt(system_prompt, user_message):
+    """The ChatML prompt previously built in MessageWorker.run"""
+    return f"""<|im_start|>system
+{system_prompt}
+<|im_start|>user
+User: {user_message}
+<|im_start|>assistant
+"""
+
+def count_tokens(model, prompt, max_tokens, template=None):
+    """Generate a reply and return (tokens generated, seconds taken)"""
+    text = ""
+    tokens = 0
+    start_time = time.time()
+    for token in model.generate(
+        prompt=prompt,
+        max_tokens=max_tokens,
+        temp=TEMPERATURE,
+        top_k=TOP_K,
+        top_p=TOP_P,
+        repeat_penalty=REPEAT_PENALTY,
+        streaming=True
+    ):
+        text += token
+        tokens += 1
+        if template and template.find_stop(text) >= 0:
+            break
+    return tokens, time.time() - start_time
+
+def main(argv=None):
+    """Run the benchmark and print average tokens per reply"""
+    parser = argparse.ArgumentParser(description="Compare tokens generated per reply")
+    parser.add_argument("--model", default=MODEL_NAME, help="Model file to load")
+    parser.add_argument("--runs", type=int, default=1, help="Repetitions per message")
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS)
+    args = parser.parse_args(argv)
+
+    model = GPT4All(args.model, device='cpu')
+    template = get_template(args.model)
+    print(f"Model: {args.model} (template: {template.name})")
+
+    results = {"legacy": [], "templated": []}
+    for message in SAMPLE_MESSAGES:
+        system_prompt = localize_system_prompt(DEFAULT_SYSTEM_PROMPT, detect_language(message))
+        for _ in range(args.runs):
+            results["legacy"].append(count_tokens(
+                model, legacy_prompt(DEFAULT_SYSTEM_PROMPT, message), args.max_tokens))
+            results["templated"].append(count_tokens(
+                model, template.render(system_prompt, message), args.max_tokens, template))
+
+    for name, samples in results.items():
+        tokens = sum(s[0] for s in samples) / len(samples)
+        seconds = sum(s[1] for s in samples) / len(samples)
+        print(f"{name:>9}: {tokens:.1f} tokens/reply, {seconds:.2f}s/reply over {len(samples)} replies")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
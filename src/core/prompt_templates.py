@@ -0,0 +1,103 @@
+"""Prompt templates and stop tokens keyed by model file"""
+import os
+import string
+
+class PromptTemplate:
+    """A prompt format precompiled into literal and field parts, with its stop tokens"""
+
+    def __init__(self, name, template, stop):
+        self.name = name
+        self.template = template
+        self.stop = tuple(stop)
+        # Parse once so rendering is a plain join
+        self.parts = list(string.Formatter().parse(template))
+
+    def render(self, system, user):
+        """Build the prompt for a system prompt and a user message"""
+        values = {"system": system, "user": user}
+        out = []
+        for literal, field, _, _ in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(values[field])
+        return "".join(out)
+
+    def find_stop(self, text):
+        """Return the index of the earliest stop token in text, or -1"""
+        positions = [i for i in (text.find(stop) for stop in self.stop) if i >= 0]
+        return min(positions) if positions else -1
+
+    def clean(self, text, final=True):
+        """Cut text at the first stop token.
+
+        While streaming (final=False) a trailing partial stop token is held
+        back as well so it is never sent.
+        """
+        index = self.find_stop(text)
+        if index >= 0:
+            return text[:index].strip()
+        if not final:
+            for stop in self.stop:
+                for length in range(min(len(stop) - 1, len(text)), 0, -1):
+                    if text.endswith(stop[:length]):
+                        text = text[:-length]
+                        break
+        return text.strip()
+
+TEMPLATES = {
+    "mistral-instruct": PromptTemplate(
+        "mistral-instruct",
+        # BOS is added by the tokenizer
+        "[INST] {system}\n\n{user} [/INST]",
+        ["</s>", "[INST]", "[/INST]"]
+    ),
+    "chatml": PromptTemplate(
+        "chatml",
+        "<|im_start|>system\n{system}<|im_end|>\n"
+        "<|im_start|>user\n{user}<|im_end|>\n"
+        "<|im_start|>assistant\n",
+        ["<|im_end|>", "<|im_start|>"]
+    ),
+    "llama3": PromptTemplate(
+        "llama3",
+        "<|start_header_id|>system<|end_header_id|>\n\n{system}<|eot_id|>"
+        "<|start_header_id|>user<|end_header_id|>\n\n{user}<|eot_id|>"
+        "<|start_header_id|>assistant<|end_header_id|>\n\n",
+        ["<|eot_id|>", "<|start_header_id|>"]
+    ),
+    "phi3": PromptTemplate(
+        "phi3",
+        "<|system|>\n{system}<|end|>\n<|user|>\n{user}<|end|>\n<|assistant|>\n",
+        ["<|end|>", "<|user|>", "<|endoftext|>"]
+    ),
+}
+
+# Exact model files with a known template
+MODEL_TEMPLATES = {
+    "mistral-7b-instruct-v0.1.Q4_0.gguf": "mistral-instruct",
+    "mistral-7b-openorca.gguf2.Q4_0.gguf": "chatml",
+    "Nous-Hermes-2-Mistral-7B-DPO.Q4_0.gguf": "chatml",
+    "Meta-Llama-3-8B-Instruct.Q4_0.gguf": "llama3",
+    "Phi-3-mini-4k-instruct.Q4_0.gguf": "phi3",
+}
+
+# Fallback substring rules for other model files, checked in order
+MODEL_NAME_RULES = [
+    ("openorca", "chatml"),
+    ("hermes", "chatml"),
+    ("llama-3", "llama3"),
+    ("llama3", "llama3"),
+    ("phi-3", "phi3"),
+    ("mistral", "mistral-instruct"),
+]
+
+DEFAULT_TEMPLATE = "chatml"
+
+def get_template(model_name):
+    """Return the prompt template for a model file"""
+    model_file = os.path.basename(model_name)
+    name = MODEL_TEMPLATES.get(model_file)
+    if name is None:
+        lowered = model_file.lower()
+        name = next((t for pattern, t in MODEL_NAME_RULES if pattern in lowered), DEFAULT_TEMPLATE)
+    return TEMPLATES[name]
@@ -0,0 +1,172 @@
+"""Replay of recorded captures for offline load testing
+
+Feeds the monitor results of a capture back through
+WhatsAppBotController.process_messages and the shared worker, with a stub
+page in place of WhatsApp Web, at 1x or accelerated speed.
+
+Usage:
+    python -m src.core.replay capture.jsonl.gz --speed 10
+    python -m src.core.replay capture.jsonl.gz --stub-model 0.05 --streaming
+"""
+import argparse
+import sys
+import time
+from PySide6.QtCore import QCoreApplication, QObject, QTimer
+
+from src.core.bot_controller import WhatsAppBotController
+from src.core.capture import read_capture, KIND_MONITOR
+from src.core.inference_engine import InferenceEngine
+from src.core.ingest import MessageIngestor
+from src.core.scheduler import format_metrics
+from src.utils.constants import PRIORITY_CLASSES, DEFAULT_PRIORITY
+
+DRAIN_POLL_INTERVAL = 200  # milliseconds
+
+class StubPage:
+    """Stand-in for QWebEnginePage that acknowledges every send"""
+
+    def __init__(self):
+        self.send_times = []
+
+    def runJavaScript(self, script, world_id, callback):
+        """Record the send and acknowledge it on the next event loop turn"""
+        self.send_times.append(time.time())
+        QTimer.singleShot(0, lambda: callback({"success": True, "message": "Replayed send"}))
+
+class StubWebView:
+    """Stand-in for WhatsAppWebView that only provides a stub page"""
+
+    def __init__(self):
+        self.stub_page = StubPage()
+
+    def page(self):
+        """Return the stub page"""
+        return self.stub_page
+
+class StubModel:
+    """Model stand-in that streams a fixed reply at a fixed token rate"""
+
+    REPLY_TOKENS = ["Thanks", " for", " your", " message", "!", " I", " will", " check",
+                    " and", " reply", " soon", "."]
+
+    def __init__(self, token_delay):
+        self.token_delay = token_delay
+
+    def generate(self, prompt, max_tokens=50, streaming=True, **kwargs):
+        """Yield the fixed reply one token at a time"""
+        for token in self.REPLY_TOKENS[:max_tokens]:
+            time.sleep(self.token_delay)
+            yield token
+
+class ReplayRunner(QObject):
+    """Schedules capture records against one controller per recorded account"""
+
+    def __init__(self, records, engine, speed=1.0, priority=DEFAULT_PRIORITY, verbose=False):
+        super().__init__()
+        self.records = [r for r in records if r.get("kind") == KIND_MONITOR]
+        self.engine = engine
+        self.speed = speed
+        self.verbose = verbose
+        self.fed = 0
+        self.start_time = None
+        self.finish_time = None
+
+        self.ingestor = MessageIngestor()
+        self.controllers = {}
+        for record in self.records:
+            account_id = record.get("account") or "default"
+            if account_id not in self.controllers:
+                controller = WhatsAppBotController(StubWebView(), engine, account_id,
+                                                   self.ingestor)
+                controller.priority = priority
+                # Records are fed directly instead of by the monitor timer
+                controller.is_monitoring = True
+                if verbose:
+                    controller.status_signal.connect(
+                        lambda message, a=account_id: print(f"[{a}] {message}"))
+                self.controllers[account_id] = controller
+
+        self.drain_timer = QTimer()
+        self.drain_timer.setInterval(DRAIN_POLL_INTERVAL)
+        self.drain_timer.timeout.connect(self._check_drained)
+
+    def start(self):
+        """Schedule every monitor record relative to the first one"""
+        self.start_time = time.time()
+        if not self.records:
+            self._finish()
+            return
+
+        first = self.records[0]["t"]
+        for record in self.records:
+            delay_ms = int((record["t"] - first) / self.speed * 1000)
+            QTimer.singleShot(delay_ms, lambda r=record: self._feed(r))
+        self.drain_timer.start()
+
+    def _feed(self, record):
+        """Hand one recorded monitor result to its controller"""
+        controller = self.controllers[record.get("account") or "default"]
+        controller.process_messages(record["data"])
+        self.fed += 1
+
+    def _check_drained(self):
+        """Finish once every record has been fed, ingested and replied to"""
+        ingesting = any(c.pending_ingest for c in self.controllers.values())
+        if self.fed == len(self.records) and not ingesting and self.engine.is_idle():
+            self._finish()
+
+    def _finish(self):
+        """Stop polling and quit the event loop"""
+        self.drain_timer.stop()
+        self.ingestor.stop()
+        self.finish_time = time.time()
+        QCoreApplication.quit()
+
+    def summary(self):
+        """Return the replay results as printable lines"""
+        elapsed = (self.finish_time or time.time()) - self.start_time
+        sends = sum(len(c.web_view.page().send_times) for c in self.controllers.values())
+        lines = [
+            f"Monitor results replayed: {self.fed} across {len(self.controllers)} account(s)",
+            f"Messages sent: {sends} in {elapsed:.1f}s ({sends / elapsed if elapsed else 0:.2f}/s)",
+        ]
+        lines.extend(format_metrics(self.engine.get_metrics()))
+        return lines
+
+def main(argv=None):
+    """Replay a capture and print throughput and latency"""
+    parser = argparse.ArgumentParser(description="Replay a monitor capture for load testing")
+    parser.add_argument("capture", help="gzip JSONL capture recorded by the bot")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier (default 1x)")
+    parser.add_argument("--stub-model", type=float, metavar="SECONDS_PER_TOKEN",
+                        help="Use a stub model instead of loading the LLM")
+    parser.add_argument("--priority", choices=list(PRIORITY_CLASSES), default=DEFAULT_PRIORITY,
+                        help="Priority class used for every replayed account")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Send each sentence as soon as it is generated")
+    parser.add_argument("--verbose", action="store_true", help="Print controller status messages")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication(sys.argv[:1])
+    engine = InferenceEngine()
+    engine.set_streaming_send(args.streaming)
+    if args.verbose:
+        engine.status_signal.connect(print)
+    if args.stub_model is not None:
+        engine.use_model(StubModel(args.stub_model))
+    elif not engine.init_llm():
+        return 1
+
+    runner = ReplayRunner(read_capture(args.capture), engine, args.speed,
+                          args.priority, args.verbose)
+    QTimer.singleShot(0, runner.start)
+    app.exec()
+    engine.cleanup()
+
+    for line in runner.summary():
+        print(line)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Deadline-aware scheduling of reply jobs"""
+import heapq
+import itertools
+import time
+from collections import deque
+
+from src.utils.constants import (
+    PRIORITY_CLASSES, DEFAULT_PRIORITY, SCHEDULER_AGING_RATE,
+    MAX_PENDING_PER_ACCOUNT, LATENCY_WINDOW
+)
+
+# Outcomes recorded for each finished job
+OUTCOME_LLM = "llm"
+OUTCOME_FAST_PATH = "fast_path"
+OUTCOME_CANNED = "canned"
+
+class ReplyJob:
+    """A single message waiting for a reply"""
+
+    def __init__(self, account_id, conversation, system_prompt,
+                 priority=DEFAULT_PRIORITY, deadline=None, enqueued_at=None):
+        if priority not in PRIORITY_CLASSES:
+            priority = DEFAULT_PRIORITY
+        self.account_id = account_id
+        self.conversation = conversation
+        self.system_prompt = system_prompt
+        self.priority = priority
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        if deadline is None:
+            deadline = self.enqueued_at + PRIORITY_CLASSES[priority]["deadline"]
+        self.deadline = deadline
+        self.cancelled = False
+
+    def slack(self, now=None):
+        """Seconds left before the deadline (negative once missed)"""
+        return self.deadline - (now if now is not None else time.time())
+
+    def sort_key(self, aging_rate):
+        """Effective deadline with aging applied.
+
+        The effective deadline is deadline - aging_rate * (now - enqueued_at).
+        Every queued job ages at the same rate, so the order only depends on
+        deadline + aging_rate * enqueued_at and can be kept in a heap.
+        """
+        return self.deadline + aging_rate * self.enqueued_at
+
+class DeadlineScheduler:
+    """Earliest-deadline-first queue with aging and a per-account cap.
+
+    Not thread safe, callers must hold their own lock.
+    """
+
+    def __init__(self, aging_rate=SCHEDULER_AGING_RATE,
+                 max_pending_per_account=MAX_PENDING_PER_ACCOUNT):
+        self.aging_rate = aging_rate
+        self.max_pending_per_account = max_pending_per_account
+        self.heap = []
+        self.per_account = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return sum(len(jobs) for jobs in self.per_account.values())
+
+    def push(self, job):
+        """Queue a job, returns the account's oldest job if it was dropped to stay under the cap"""
+        dropped = None
+        jobs = self.per_account.setdefault(job.account_id, deque())
+        if len(jobs) >= self.max_pending_per_account:
+            dropped = jobs.popleft()
+            dropped.cancelled = True
+        jobs.append(job)
+        heapq.heappush(self.heap, (job.sort_key(self.aging_rate), next(self.counter), job))
+        return dropped
+
+    def pop(self):
+        """Return the job with the earliest effective deadline, or None"""
+        while self.heap:
+            _, _, job = heapq.heappop(self.heap)
+            if job.cancelled:
+                continue
+            self.per_account[job.account_id].remove(job)
+            return job
+        return None
+
+    def pending_count(self, account_id=None):
+        """Return the number of queued jobs, optionally for one account"""
+        if account_id is not None:
+            return len(self.per_account.get(account_id, ()))
+        return len(self)
+
+class LatencyStats:
+    """Per-priority-class reply latency metrics"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.first_samples = {}
+        self.counts = {}
+
+    def record(self, priority, latency, outcome, missed=False, first_latency=None):
+        """Record the enqueue-to-reply latency of a finished job.
+
+        first_latency is the time until the first message went out, which is
+        shorter than latency when the reply was streamed in several messages.
+        """
+        samples = self.samples.setdefault(priority, deque(maxlen=self.window))
+        samples.append(latency)
+        first_samples = self.first_samples.setdefault(priority, deque(maxlen=self.window))
+        first_samples.append(latency if first_latency is None else first_latency)
+        counts = self._counts(priority)
+        counts["total"] += 1
+        counts[outcome] += 1
+        if missed:
+            counts["missed"] += 1
+
+    def record_dropped(self, priority):
+        """Count a queued job that was dropped without a reply"""
+        self._counts(priority)["dropped"] += 1
+
+    def _counts(self, priority):
+        return self.counts.setdefault(priority, {
+            "total": 0, "missed": 0, "dropped": 0,
+            OUTCOME_LLM: 0, OUTCOME_FAST_PATH: 0, OUTCOME_CANNED: 0
+        })
+
+    def snapshot(self):
+        """Return a dict of metrics keyed by priority class"""
+        metrics = {}
+        for priority, counts in self.counts.items():
+            ordered = sorted(self.samples.get(priority) or [0.0])
+            first_ordered = sorted(self.first_samples.get(priority) or [0.0])
+            metrics[priority] = dict(counts)
+            metrics[priority].update({
+                "mean": sum(ordered) / len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": _percentile(ordered, 0.95),
+                "max": ordered[-1],
+                "first_mean": sum(first_ordered) / len(first_ordered),
+                "first_p95": _percentile(first_ordered, 0.95),
+            })
+        return metrics
+
+def _percentile(ordered, fraction):
+    """Return the given percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def format_metrics(metrics):
+    """Return one human readable line per priority class of a metrics snapshot"""
+    lines = []
+    for priority, m in sorted(metrics.items()):
+        lines.append(
+            f"{priority}: n={m['total']} mean={m['mean']:.1f}s p50={m['p50']:.1f}s "
+            f"p95={m['p95']:.1f}s max={m['max']:.1f}s "
+            f"first_msg_mean={m['first_mean']:.1f}s first_msg_p95={m['first_p95']:.1f}s "
+            f"missed={m['missed']} dropped={m['dropped']} "
+            f"fast={m[OUTCOME_FAST_PATH]} canned={m[OUTCOME_CANNED]}"
+        )
+    return lines
@@ -0,0 +1,39 @@
+"""Sentence splitting for streaming replies while tokens are generated"""
+import re
+
+from src.utils.constants import STREAMING_MIN_SENTENCE_LENGTH
+
+# A sentence ends at terminal punctuation (optionally closed by a quote or
+# bracket) followed by whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?…])["\')\]]*\s+')
+
+class SentenceStreamer:
+    """Tracks generated text and hands out each sentence once it is complete"""
+
+    def __init__(self, min_length=STREAMING_MIN_SENTENCE_LENGTH):
+        self.min_length = min_length
+        self.offset = 0
+
+    def update(self, text):
+        """Return sentences completed since the last call.
+
+        text is the whole reply generated so far. Sentences shorter than
+        min_length are held back and joined with the following one.
+        """
+        pending = text[self.offset:]
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(pending):
+            sentence = pending[start:match.end()].strip()
+            if len(sentence) < self.min_length:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self.offset += start
+        return sentences
+
+    def flush(self, text):
+        """Return whatever has not been handed out yet"""
+        remainder = text[self.offset:].strip()
+        self.offset = len(text)
+        return remainder
@@ -0,0 +1,223 @@
+"""Health watchdog that recovers a stalled page, worker or model"""
+import time
+from PySide6.QtCore import QObject, Signal, QTimer
+
+from src.utils.constants import (
+    WATCHDOG_CHECK_INTERVAL, WATCHDOG_MONITOR_TIMEOUT, WATCHDOG_WORKER_TIMEOUT,
+    WATCHDOG_SEND_TIMEOUT, WATCHDOG_ESCALATION_DELAY, WATCHDOG_MAX_RECOVERY_ACTIONS,
+    WATCHDOG_LOADING_TIMEOUT
+)
+from src.core.ingest import PAGE_LOGIN, PAGE_LOADING
+
+# Recovery actions
+ACTION_RELOAD_PAGE = "reload_page"
+ACTION_RESTART_WORKER = "restart_worker"
+ACTION_RELOAD_MODEL = "reload_model"
+
+# Escalation order per stall target. A page stall only touches that
+# account's page, the shared worker and model serve every account.
+# A logged-out page needs the user to scan the QR code, reloading cannot fix it.
+PAGE_ESCALATION = [ACTION_RELOAD_PAGE]
+LOGIN_ESCALATION = []
+WORKER_ESCALATION = [ACTION_RESTART_WORKER, ACTION_RELOAD_MODEL]
+
+# Heartbeat kinds and the stall reasons they resolve
+RESOLVED_BY = {
+    "monitor": ("monitor", "login"),
+    "send": ("send",),
+    "worker": ("worker",),
+}
+
+WORKER_TARGET = "worker"
+
+class Incident:
+    """An ongoing stall and the recovery steps taken for it"""
+
+    def __init__(self, target, reason, steps, now):
+        self.target = target
+        self.reason = reason
+        self.steps = steps
+        self.level = 0
+        self.exhausted = False
+        self.gave_up = False
+        self.started = now
+        self.last_action = now
+        self.actions = []
+
+class HealthWatchdog(QObject):
+    """Tracks monitor, worker and send heartbeats and recovers stalls.
+
+    A page stall (no successful monitor result, or a sent reply that never
+    shows up in the chat) is recovered by reloading that account's page. A
+    logged-out page is never reloaded, the user is asked to log in again,
+    and a page that is still loading or syncing chats gets
+    WATCHDOG_LOADING_TIMEOUT before it counts as stalled. A worker stall (a
+    job without progress) first restarts the worker, then reloads the model
+    if it persists. Once every step for a stall has been tried, only the
+    first one is retried, with the delay doubling after each step, until
+    WATCHDOG_MAX_RECOVERY_ACTIONS steps have been taken.
+    """
+    status_signal = Signal(str)
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self.controllers = []
+        self.last_beat = {}  # (kind, account_id) -> time
+        self.incidents = {}  # target -> Incident
+        self.recoveries = []  # (reason, seconds to recovery, actions taken)
+        self.engine.progress_signal.connect(lambda account_id, _: self.beat("worker"))
+        self.check_timer = QTimer()
+        self.check_timer.setInterval(WATCHDOG_CHECK_INTERVAL)
+        self.check_timer.timeout.connect(self.check)
+
+    def watch(self, controller):
+        """Track the heartbeats of an account"""
+        self.controllers.append(controller)
+        controller.heartbeat_signal.connect(self.beat)
+
+    def start(self):
+        """Start periodic health checks"""
+        self.check_timer.start()
+
+    def stop(self):
+        """Stop periodic health checks"""
+        self.check_timer.stop()
+
+    def beat(self, kind, account_id=""):
+        """Record a heartbeat and close the incident it resolves"""
+        now = time.time()
+        self.last_beat[(kind, account_id)] = now
+        target = WORKER_TARGET if kind == "worker" else account_id
+        incident = self.incidents.get(target)
+        if incident and incident.reason in RESOLVED_BY.get(kind, ()):
+            self._resolve(incident, now)
+
+    def check(self, now=None):
+        """Look for stalls and start or escalate recovery"""
+        now = now if now is not None else time.time()
+
+        for controller in self.controllers:
+            account_id = controller.account_id
+            if not controller.is_monitoring:
+                self.incidents.pop(account_id, None)
+                continue
+            reason = None
+            steps = PAGE_ESCALATION
+            last_monitor = self.last_beat.setdefault(("monitor", account_id), now)
+            last_login = self.last_beat.get((PAGE_LOGIN, account_id), 0)
+            last_loading = self.last_beat.get((PAGE_LOADING, account_id), 0)
+            if now - last_monitor > WATCHDOG_MONITOR_TIMEOUT:
+                if last_login > max(last_monitor, last_loading):
+                    reason, steps = "login", LOGIN_ESCALATION
+                elif (last_loading <= last_monitor or
+                        now - last_monitor > WATCHDOG_LOADING_TIMEOUT):
+                    reason = "monitor"
+            elif (controller.awaiting_ack_since is not None and
+                    now - controller.awaiting_ack_since > WATCHDOG_SEND_TIMEOUT):
+                reason = "send"
+            self._handle(account_id, reason, steps, now)
+
+        reason = None
+        busy_since = self.engine.worker_busy_since()
+        if busy_since is not None:
+            last_progress = max(busy_since, self.last_beat.get(("worker", ""), 0))
+            if now - last_progress > WATCHDOG_WORKER_TIMEOUT:
+                reason = "worker"
+        elif WORKER_TARGET in self.incidents:
+            # The worker went idle, so whatever was stuck has finished
+            self._resolve(self.incidents[WORKER_TARGET], now)
+        self._handle(WORKER_TARGET, reason, WORKER_ESCALATION, now)
+
+    def _handle(self, target, reason, steps, now):
+        """Open, escalate or leave an incident for one target"""
+        incident = self.incidents.get(target)
+        if reason is None:
+            if incident and target != WORKER_TARGET:
+                # Healthy again once the page reported in after the last action
+                last_monitor = self.last_beat.get(("monitor", target), 0)
+                if last_monitor > incident.last_action:
+                    self._resolve(incident, last_monitor)
+            return
+        if incident is not None and incident.reason != reason:
+            # E.g. a reloaded page now shows the QR code
+            del self.incidents[target]
+            incident = None
+        if incident is None:
+            incident = self.incidents[target] = Incident(target, reason, steps, now)
+            if not steps:
+                self.status_signal.emit(
+                    f"Watchdog: {target} is logged out, scan the QR code in its tab to log in again")
+                return
+            self.status_signal.emit(f"Watchdog: {reason} stalled for {target}")
+        elif not incident.steps or incident.gave_up:
+            return
+        elif len(incident.actions) >= WATCHDOG_MAX_RECOVERY_ACTIONS:
+            incident.gave_up = True
+            self.status_signal.emit(
+                f"Watchdog: giving up on {target} after {len(incident.actions)} recovery steps")
+            return
+        elif now - incident.last_action >= WATCHDOG_ESCALATION_DELAY * 2 ** (len(incident.actions) - 1):
+            if incident.exhausted:
+                pass
+            elif incident.level + 1 < len(incident.steps):
+                incident.level += 1
+            else:
+                incident.exhausted = True
+                incident.level = 0
+                self.status_signal.emit(
+                    f"Watchdog: {target} still stalled after all recovery steps")
+        else:
+            return
+        self._recover(incident, now)
+
+    def _recover(self, incident, now):
+        """Run the recovery action for the incident's escalation level"""
+        action = incident.steps[incident.level]
+        incident.actions.append(action)
+        incident.last_action = now
+        self.status_signal.emit(f"Watchdog: {action.replace('_', ' ')} ({incident.reason} stall)")
+        try:
+            if action == ACTION_RELOAD_PAGE:
+                for controller in self.controllers:
+                    if controller.account_id == incident.target:
+                        controller.reload_page()
+            elif action == ACTION_RESTART_WORKER:
+                self.engine.restart_worker()
+            else:
+                self.engine.reload_model()
+        except Exception as e:
+            self.status_signal.emit(f"Watchdog: recovery failed: {str(e)}")
+
+    def _resolve(self, incident, now):
+        """Close an incident and record its time to recovery"""
+        self.incidents.pop(incident.target, None)
+        seconds = max(0.0, now - incident.started)
+        self.recoveries.append((incident.reason, seconds, list(incident.actions)))
+        steps = ", ".join(incident.actions) or "none"
+        self.status_signal.emit(
+            f"Watchdog: {incident.target} recovered in {seconds:.1f}s (steps: {steps})")
+
+    def get_metrics(self):
+        """Return time-to-recovery metrics keyed by stall reason"""
+        metrics = {}
+        for reason, seconds, actions in self.recoveries:
+            entry = metrics.setdefault(reason, {"count": 0, "total": 0.0, "max": 0.0, "actions": 0})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["actions"] += len(actions)
+        for entry in metrics.values():
+            entry["mean"] = entry.pop("total") / entry["count"]
+        return metrics
+
+    def format_metrics(self):
+        """Return time-to-recovery metrics as log lines"""
+        lines = [
+            f"{reason}: recoveries={m['count']} mean={m['mean']:.1f}s "
+            f"max={m['max']:.1f}s steps={m['actions']}"
+            for reason, m in sorted(self.get_metrics().items())
+        ]
+        if self.incidents:
+            lines.append(f"ongoing stalls: {', '.join(sorted(self.incidents))}")
+        return lines
@@ -1,24 +1,84 @@
 """Custom WebView component for WhatsApp Web integration"""
 import os
 from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWebEngineCore import QWebEngineProfile, QWebEngineSettings, QWebEnginePage
+from PySide6.QtWebEngineCore import (
+    QWebEngineProfile, QWebEngineSettings, QWebEnginePage,
+    QWebEngineScript, QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+)
 from PySide6.QtCore import QUrl
 
+from src.utils.constants import LEAN_HTTP_CACHE_SIZE, LEAN_BLOCKED_URL_PATTERNS
+from src.utils.process_stats import get_process_rss
+
+# Chromium switches applied in lean mode, must be set before QApplication is created
+LEAN_CHROMIUM_FLAGS = [
+    "--renderer-process-limit=1",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-features=BackForwardCache,MediaRouter",
+]
+
+# Stylesheet injected in lean mode to stop CSS animations and transitions
+LEAN_STYLE_SCRIPT = """
+(function() {
+    const style = document.createElement('style');
+    style.textContent = '*, *::before, *::after { animation: none !important; ' +
+        'transition: none !important; } img, video { visibility: hidden !important; }';
+    (document.head || document.documentElement).appendChild(style);
+})();
+"""
+
+def apply_lean_chromium_flags():
+    """Add lean mode Chromium switches to the QtWebEngine environment"""
+    flags = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "").split()
+    for flag in LEAN_CHROMIUM_FLAGS:
+        if flag not in flags:
+            flags.append(flag)
+    os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(flags)
+
+class MediaBlockingInterceptor(QWebEngineUrlRequestInterceptor):
+    """Request interceptor that blocks image and media downloads"""
+    
+    BLOCKED_TYPES = (
+        QWebEngineUrlRequestInfo.ResourceTypeImage,
+        QWebEngineUrlRequestInfo.ResourceTypeMedia,
+        QWebEngineUrlRequestInfo.ResourceTypeFavicon,
+        QWebEngineUrlRequestInfo.ResourceTypeFontResource,
+    )
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.blocked_count = 0
+        
+    def interceptRequest(self, info):
+        """Block requests for images, media and media CDN hosts"""
+        url = info.requestUrl().toString()
+        if (info.resourceType() in self.BLOCKED_TYPES or
+                any(pattern in url for pattern in LEAN_BLOCKED_URL_PATTERNS)):
+            info.block(True)
+            self.blocked_count += 1
+
 class WhatsAppWebView(QWebEngineView):
     """Custom WebView for WhatsApp Web with persistent storage"""
     
-    def __init__(self, profile_dir):
+    def __init__(self, profile_dir, lean=False, profile_name="WhatsAppBot"):
         super().__init__()
         self.profile_dir = profile_dir
+        self.profile_name = profile_name
+        self.lean = lean
+        self.interceptor = None
         self._setup_profile()
         self._setup_settings()
+        if self.lean:
+            self._setup_lean_mode()
         
     def _setup_profile(self):
         """Set up custom web profile with persistent storage"""
         if not os.path.exists(self.profile_dir):
             os.makedirs(self.profile_dir)
             
-        self.web_profile = QWebEngineProfile("WhatsAppBot", self)
+        # Each account needs its own named profile to keep sessions separate
+        self.web_profile = QWebEngineProfile(self.profile_name, self)
         self.web_profile.setPersistentStoragePath(self.profile_dir)
         self.web_profile.setPersistentCookiesPolicy(QWebEngineProfile.AllowPersistentCookies)
         self.web_profile.setHttpUserAgent(
@@ -37,6 +97,39 @@ class WhatsAppWebView(QWebEngineView):
         settings.setAttribute(QWebEngineSettings.JavascriptEnabled, True)
         settings.setAttribute(QWebEngineSettings.JavascriptCanAccessClipboard, True)
         
+    def _setup_lean_mode(self):
+        """Block media, disable unneeded features and cap the cache"""
+        self.interceptor = MediaBlockingInterceptor(self)
+        self.web_profile.setUrlRequestInterceptor(self.interceptor)
+        self.web_profile.setHttpCacheMaximumSize(LEAN_HTTP_CACHE_SIZE)
+        
+        settings = self.web_profile.settings()
+        settings.setAttribute(QWebEngineSettings.AutoLoadImages, False)
+        settings.setAttribute(QWebEngineSettings.AutoLoadIconsForPage, False)
+        settings.setAttribute(QWebEngineSettings.PluginsEnabled, False)
+        settings.setAttribute(QWebEngineSettings.PdfViewerEnabled, False)
+        settings.setAttribute(QWebEngineSettings.WebGLEnabled, False)
+        settings.setAttribute(QWebEngineSettings.Accelerated2dCanvasEnabled, False)
+        settings.setAttribute(QWebEngineSettings.ScrollAnimatorEnabled, False)
+        settings.setAttribute(QWebEngineSettings.PlaybackRequiresUserGesture, True)
+        
+        # Disable CSS animations once the DOM is ready
+        script = QWebEngineScript()
+        script.setName("lean-mode-style")
+        script.setSourceCode(LEAN_STYLE_SCRIPT)
+        script.setInjectionPoint(QWebEngineScript.DocumentReady)
+        script.setWorldId(QWebEngineScript.ApplicationWorld)
+        script.setRunsOnSubFrames(False)
+        self.web_profile.scripts().insert(script)
+        
+    def renderer_pid(self):
+        """Return the PID of the renderer process, or 0 if not running"""
+        return self.page().renderProcessPid()
+        
+    def renderer_memory(self):
+        """Return the renderer process RSS in bytes, or None if unavailable"""
+        return get_process_rss(self.renderer_pid())
+        
     def load_whatsapp(self):
         """Load WhatsApp Web"""
         self.setUrl(QUrl("https://web.whatsapp.com")) 
\ No newline at end of file
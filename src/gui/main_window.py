@@ -3,12 +3,23 @@ import os
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QLabel, QLineEdit, 
     QPushButton, QTextEdit, QHBoxLayout, QGroupBox, 
-    QMessageBox, QSplitter
+    QMessageBox, QSplitter, QTabWidget, QComboBox, QCheckBox
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 
 from src.gui.components.web_view import WhatsAppWebView
 from src.core.bot_controller import WhatsAppBotController
+from src.core.inference_engine import InferenceEngine
+from src.core.capture import CaptureRecorder
+from src.core.ingest import MessageIngestor
+from src.core.watchdog import HealthWatchdog
+from src.utils.profiler import RuntimeProfiler
+from src.utils.constants import (
+    LEAN_BROWSER_MODE, RENDERER_MEMORY_REPORT_DELAY, MAX_ACCOUNTS, DEFAULT_SYSTEM_PROMPT,
+    PRIORITY_CLASSES, DEFAULT_PRIORITY, CAPTURE_PATH,
+    PROFILE_ON_START, PROFILE_OUTPUT_DIR
+)
+from src.utils.process_stats import format_bytes
 
 class WhatsAppBotWindow(QMainWindow):
     """Main application window for WhatsApp Chat Bot"""
@@ -21,30 +32,90 @@ class WhatsAppBotWindow(QMainWindow):
         # Set up persistent storage directory
         self.profile_dir = os.path.join(os.path.expanduser("~"), ".whatsapp_bot_profile")
         
+        # Accounts share one inference engine, each has its own profile and controller
+        self.accounts = []
+        self.phone_numbers = {}
+        self.recorder = CaptureRecorder(CAPTURE_PATH) if CAPTURE_PATH else None
+        
+        # Renderer PIDs are tracked on the GUI thread for the profiler to read
+        self.renderer_pids = {}
+        self.profiler = RuntimeProfiler(PROFILE_OUTPUT_DIR, lambda: dict(self.renderer_pids))
+        
         # Initialize components
-        self.init_web_view()
-        self.init_bot_controller()
+        self.init_inference_engine()
         self.init_ui()
+        self.add_account()
         
         # Log initial message
         self.log_status("WhatsApp Bot initialized.")
         self.log_status("Click 'Open WhatsApp Web' to start.")
         self.log_status(f"Browser data stored in: {self.profile_dir}")
+        if LEAN_BROWSER_MODE:
+            self.log_status("Lean browser mode enabled (media blocked, animations off).")
+        if self.recorder:
+            self.log_status(f"Recording monitor and send results to: {self.recorder.path}")
+        if PROFILE_ON_START:
+            self.toggle_profiling()
     
-    def init_web_view(self):
-        """Initialize the web view component"""
-        self.web_view = WhatsAppWebView(self.profile_dir)
-        self.web_view.setMinimumSize(800, 600)
-        self.web_view.loadFinished.connect(self.on_page_loaded)
-        self.web_view.urlChanged.connect(self.update_url_bar)
-        
-    def init_bot_controller(self):
-        """Initialize the bot controller"""
-        self.bot_controller = WhatsAppBotController(self.web_view)
-        self.bot_controller.status_signal.connect(self.log_status)
-        self.bot_controller.error_signal.connect(self.show_error)
-        self.bot_controller.progress_signal.connect(self.update_progress)
+    @property
+    def bot_controller(self):
+        """Controller of the account shown in the current tab"""
+        return self.accounts[self.account_tabs.currentIndex()]
+        
+    @property
+    def web_view(self):
+        """Web view of the account shown in the current tab"""
+        return self.bot_controller.web_view
+        
+    def account_profile_dir(self, index):
+        """Return the browser profile directory for an account"""
+        if index == 0:
+            return self.profile_dir
+        return f"{self.profile_dir}_{index + 1}"
+        
+    def init_inference_engine(self):
+        """Initialize the inference engine shared by all accounts"""
+        self.engine = InferenceEngine()
+        self.engine.status_signal.connect(self.log_status)
+        # Monitor results for every account are parsed on one ingest thread
+        self.ingestor = MessageIngestor()
+        # Recovers stalled pages, a stuck worker or a broken model
+        self.watchdog = HealthWatchdog(self.engine)
+        self.watchdog.status_signal.connect(self.log_status)
+        self.watchdog.start()
+        
+    def add_account(self):
+        """Create a web view and bot controller for a new account"""
+        if len(self.accounts) >= MAX_ACCOUNTS:
+            self.show_error(f"At most {MAX_ACCOUNTS} accounts are supported.", "Account Limit")
+            return
+            
+        index = len(self.accounts)
+        account_id = f"Account {index + 1}"
+        profile_dir = self.account_profile_dir(index)
+        
+        web_view = WhatsAppWebView(profile_dir, lean=LEAN_BROWSER_MODE,
+                                   profile_name=f"WhatsAppBot{index + 1}")
+        web_view.setMinimumSize(800, 600)
+        web_view.loadFinished.connect(lambda success: self.on_page_loaded(web_view, success))
+        web_view.urlChanged.connect(self.update_url_bar)
+        web_view.page().renderProcessPidChanged.connect(
+            lambda pid: self.renderer_pids.__setitem__(account_id, pid))
+        
+        controller = WhatsAppBotController(web_view, self.engine, account_id, self.ingestor)
+        controller.status_signal.connect(lambda message: self.log_status(f"[{account_id}] {message}"))
+        controller.error_signal.connect(self.show_error)
+        controller.progress_signal.connect(self.update_progress)
+        controller.set_recorder(self.recorder)
+        self.watchdog.watch(controller)
+        
+        self.accounts.append(controller)
+        self.account_tabs.addTab(web_view, account_id)
+        self.account_tabs.setCurrentIndex(index)
+        if index > 0:
+            self.log_status(f"Added {account_id}, browser data stored in: {profile_dir}")
         
+
     def init_ui(self):
         """Initialize the user interface"""
         # Main widget and layout
@@ -83,8 +154,10 @@ class WhatsAppBotWindow(QMainWindow):
         # System prompt input
         self.setup_prompt_input(right_layout)
         
-        # Add web view to right panel
-        right_layout.addWidget(self.web_view)
+        # Add one tab per account to right panel
+        self.account_tabs = QTabWidget()
+        self.account_tabs.currentChanged.connect(self.on_account_changed)
+        right_layout.addWidget(self.account_tabs)
         
         # Set initial splitter sizes (30% left, 70% right)
         splitter.setSizes([360, 840])
@@ -98,9 +171,18 @@ class WhatsAppBotWindow(QMainWindow):
         self.phone_label = QLabel("Target Phone Number (with country code):")
         self.phone_input = QLineEdit()
         self.phone_input.setPlaceholderText("+1234567890")
+        self.phone_input.textChanged.connect(self.store_phone_number)
+        
+        self.priority_label = QLabel("Reply priority:")
+        self.priority_input = QComboBox()
+        self.priority_input.addItems(list(PRIORITY_CLASSES))
+        self.priority_input.setCurrentText(DEFAULT_PRIORITY)
+        self.priority_input.currentTextChanged.connect(self.set_priority)
         
         phone_layout.addWidget(self.phone_label)
         phone_layout.addWidget(self.phone_input)
+        phone_layout.addWidget(self.priority_label)
+        phone_layout.addWidget(self.priority_input)
         parent_layout.addWidget(phone_group)
         
     def setup_model_settings_group(self, parent_layout):
@@ -113,8 +195,13 @@ class WhatsAppBotWindow(QMainWindow):
         self.init_model_btn = QPushButton("Initialize AI Model")
         self.init_model_btn.clicked.connect(self.init_llm)
         
+        self.streaming_checkbox = QCheckBox("Send replies sentence by sentence")
+        self.streaming_checkbox.setChecked(self.engine.streaming_send)
+        self.streaming_checkbox.toggled.connect(self.engine.set_streaming_send)
+        
         model_layout.addWidget(self.model_label)
         model_layout.addWidget(self.init_model_btn)
+        model_layout.addWidget(self.streaming_checkbox)
         parent_layout.addWidget(model_group)
         
     def setup_status_display(self, parent_layout):
@@ -138,16 +225,25 @@ class WhatsAppBotWindow(QMainWindow):
         self.start_button = QPushButton("Start Bot")
         self.stop_button = QPushButton("Stop Bot")
         self.open_whatsapp_btn = QPushButton("Open WhatsApp Web")
+        self.add_account_btn = QPushButton("Add Account")
+        self.metrics_btn = QPushButton("Show Latency Metrics")
+        self.profile_btn = QPushButton("Start Profiling")
         
         self.start_button.clicked.connect(self.start_bot)
         self.stop_button.clicked.connect(self.stop_bot)
         self.open_whatsapp_btn.clicked.connect(self.open_whatsapp)
+        self.add_account_btn.clicked.connect(self.add_account)
+        self.metrics_btn.clicked.connect(self.show_latency_metrics)
+        self.profile_btn.clicked.connect(self.toggle_profiling)
         
         self.stop_button.setEnabled(False)
         
+        buttons_layout.addWidget(self.add_account_btn)
         buttons_layout.addWidget(self.open_whatsapp_btn)
         buttons_layout.addWidget(self.start_button)
         buttons_layout.addWidget(self.stop_button)
+        buttons_layout.addWidget(self.metrics_btn)
+        buttons_layout.addWidget(self.profile_btn)
         parent_layout.addWidget(buttons_group)
         
     def setup_prompt_input(self, parent_layout):
@@ -163,9 +259,7 @@ class WhatsAppBotWindow(QMainWindow):
         self.prompt_input.setMaximumHeight(80)
         
         # Set the default prompt text
-        default_prompt = self.bot_controller.get_system_prompt()
-        if default_prompt:
-            self.prompt_input.setText(default_prompt)
+        self.prompt_input.setText(DEFAULT_SYSTEM_PROMPT)
         
         prompt_layout.addWidget(prompt_label)
         prompt_layout.addWidget(self.prompt_input)
@@ -183,20 +277,78 @@ class WhatsAppBotWindow(QMainWindow):
         """Update progress in the status display"""
         self.log_status(f"Progress: {value}%")
         
-    def on_page_loaded(self, success):
+    def on_page_loaded(self, web_view, success):
         """Handle page load completion"""
         if success:
             self.log_status("Page loaded successfully")
+            self.report_renderer_memory(web_view)
+            # Report again once WhatsApp Web has finished its initial sync
+            QTimer.singleShot(RENDERER_MEMORY_REPORT_DELAY,
+                              lambda: self.report_renderer_memory(web_view))
         else:
             self.log_status("Page failed to load")
             
+    def report_renderer_memory(self, web_view):
+        """Log the current renderer process memory usage"""
+        mode = "lean" if web_view.lean else "full"
+        memory = format_bytes(web_view.renderer_memory())
+        self.log_status(f"Renderer memory ({web_view.profile_name}, {mode} mode): {memory}")
+            
+    def on_account_changed(self, index):
+        """Show the settings of the selected account"""
+        if index < 0 or index >= len(self.accounts):
+            return
+        controller = self.accounts[index]
+        self.phone_input.setText(self.phone_numbers.get(controller.account_id, ""))
+        self.prompt_input.setText(controller.get_system_prompt())
+        self.priority_input.setCurrentText(controller.priority)
+        self.start_button.setEnabled(not controller.is_monitoring)
+        self.stop_button.setEnabled(controller.is_monitoring)
+        
+    def set_priority(self, priority):
+        """Apply the selected priority class to the current account"""
+        if self.accounts and priority != self.bot_controller.priority:
+            self.bot_controller.set_priority(priority)
+            
+    def show_latency_metrics(self):
+        """Log per-priority-class reply latency and watchdog recovery metrics"""
+        lines = self.engine.format_metrics()
+        if not lines:
+            self.log_status("No latency metrics recorded yet.")
+        else:
+            self.log_status("Reply latency by priority class:")
+            for line in lines:
+                self.log_status(f"  {line}")
+                
+        lines = self.watchdog.format_metrics()
+        if lines:
+            self.log_status("Watchdog time to recovery:")
+            for line in lines:
+                self.log_status(f"  {line}")
+            
+    def toggle_profiling(self):
+        """Start or stop CPU sampling, tracemalloc snapshots and RSS tracking"""
+        if self.profiler.is_running:
+            self.profiler.stop()
+            self.profile_btn.setText("Start Profiling")
+            self.log_status(f"Profiling stopped, output in: {self.profiler.session_dir}")
+        else:
+            session_dir = self.profiler.start()
+            self.profile_btn.setText("Stop Profiling")
+            self.log_status(f"Profiling started, writing to: {session_dir}")
+            
+    def store_phone_number(self, text):
+        """Remember the phone number entered for the current account"""
+        if self.accounts:
+            self.phone_numbers[self.bot_controller.account_id] = text.strip()
+            
     def update_url_bar(self, url):
         """Update status when URL changes"""
         self.log_status(f"Navigated to: {url.toString()}")
         
     def init_llm(self):
         """Initialize the language model"""
-        if self.bot_controller.init_llm():
+        if self.engine.init_llm():
             self.model_label.setText("Model initialized: Yes")
             self.init_model_btn.setEnabled(False)
         
@@ -209,6 +361,7 @@ class WhatsAppBotWindow(QMainWindow):
             self.bot_controller.set_system_prompt(system_prompt)
             
         if self.bot_controller.start_monitoring(phone_number):
+            self.priority_input.setCurrentText(self.bot_controller.priority)
             self.start_button.setEnabled(False)
             self.stop_button.setEnabled(True)
         
@@ -224,5 +377,12 @@ class WhatsAppBotWindow(QMainWindow):
         
     def closeEvent(self, event):
         """Handle application closure"""
-        self.bot_controller.cleanup()
+        self.profiler.stop()
+        self.watchdog.stop()
+        for controller in self.accounts:
+            controller.cleanup()
+        self.engine.cleanup()
+        self.ingestor.stop()
+        if self.recorder:
+            self.recorder.close()
         event.accept() 
\ No newline at end of file
@@ -1,4 +1,5 @@
 """Constants and configuration for the WhatsApp Bot application"""
+import os
 
 # LLM Configuration
 MODEL_NAME = "mistral-7b-instruct-v0.1.Q4_0.gguf"
@@ -12,10 +13,99 @@ REPEAT_PENALTY = 1.1
 MONITOR_INTERVAL = 15000  # 15 seconds in milliseconds
 MESSAGE_TIMEOUT = 15  # 15 seconds timeout for message generation
 
+# Streaming Send Configuration
+# Send each complete sentence as its own message while the reply is generating
+STREAMING_SEND = os.environ.get("WHATSAPP_BOT_STREAM_SEND", "0") == "1"
+STREAMING_MIN_SENTENCE_LENGTH = 12  # Shorter sentences are joined with the next
+
+# Capture Configuration
+# Path of a gzip JSONL file that records monitor and send results for replay.
+# Each session writes its own file with a timestamp added to the name.
+CAPTURE_PATH = os.environ.get("WHATSAPP_BOT_CAPTURE") or None
+CAPTURE_FLUSH_INTERVAL = 2  # Seconds between flushes, bounds what a crash loses
+
+# Profiling Configuration
+# Set WHATSAPP_BOT_PROFILE=1 to start profiling on launch, or use the GUI toggle
+PROFILE_ON_START = os.environ.get("WHATSAPP_BOT_PROFILE", "0") == "1"
+PROFILE_OUTPUT_DIR = os.environ.get(
+    "WHATSAPP_BOT_PROFILE_DIR",
+    os.path.join(os.path.expanduser("~"), ".whatsapp_bot_profiles")
+)
+PROFILE_SAMPLE_INTERVAL = 0.01  # 10 ms between CPU stack samples
+PROFILE_RSS_INTERVAL = 5  # seconds between RSS records
+PROFILE_SNAPSHOT_INTERVAL = 60  # seconds between tracemalloc snapshots
+PROFILE_MAX_STACK_DEPTH = 64
+PROFILE_TRACEMALLOC_FRAMES = 10
+
+# Ingest Configuration
+INGEST_MAX_MESSAGE_LENGTH = 2000  # Longer incoming messages are truncated
+
+# Watchdog Configuration
+WATCHDOG_CHECK_INTERVAL = 10000  # 10 seconds in milliseconds
+WATCHDOG_MONITOR_TIMEOUT = 4 * MONITOR_INTERVAL / 1000  # seconds without a healthy poll
+WATCHDOG_WORKER_TIMEOUT = 3 * MESSAGE_TIMEOUT  # seconds a job may go without progress
+WATCHDOG_SEND_TIMEOUT = 4 * MONITOR_INTERVAL / 1000  # seconds for a sent reply to show up
+WATCHDOG_ESCALATION_DELAY = 60  # seconds before the next recovery step, doubled after each one
+WATCHDOG_MAX_RECOVERY_ACTIONS = 5  # recovery steps per stall before giving up
+WATCHDOG_LOADING_TIMEOUT = 300  # seconds a page may spend loading or syncing chats
+WORKER_JOIN_TIMEOUT = 5000  # ms to wait for a replaced worker on shutdown
+
+# Account Configuration
+MAX_ACCOUNTS = 8
+MAX_PENDING_PER_ACCOUNT = 3  # Oldest queued message is dropped (and counted) beyond this
+
+# Reply Scheduling Configuration
+# Each class sets the response-time deadline (seconds after the message arrives)
+PRIORITY_CLASSES = {
+    "vip": {"deadline": 20},
+    "normal": {"deadline": 60},
+    "low": {"deadline": 180},
+}
+DEFAULT_PRIORITY = "normal"
+CONTACT_PRIORITIES = {}  # e.g. {"+1234567890": "vip"}
+SCHEDULER_AGING_RATE = 0.5  # Seconds of deadline credit per second waited
+FAST_PATH_SLACK = 10  # Use the fast path when less than this many seconds remain
+FAST_PATH_MAX_TOKENS = 20
+CANNED_REPLY = "Thanks for your message! We'll get back to you shortly."
+LATENCY_WINDOW = 500  # Latency samples kept per priority class
+
+# Browser Configuration
+# Lean mode blocks images/media, disables animations and caps the HTTP cache
+LEAN_BROWSER_MODE = os.environ.get("WHATSAPP_BOT_LEAN", "0") == "1"
+LEAN_HTTP_CACHE_SIZE = 16 * 1024 * 1024  # 16 MB
+RENDERER_MEMORY_REPORT_DELAY = 30000  # 30 seconds after page load
+LEAN_BLOCKED_URL_PATTERNS = [
+    "media.whatsapp.net",
+    "mmg.whatsapp.net",
+    "pps.whatsapp.net",
+]
+
 # Default System Prompt
 DEFAULT_SYSTEM_PROMPT = """You are a WhatsApp assistant. Keep responses very concise (1-2 sentences).
 Respond naturally and be helpful while maintaining a friendly tone. Match the language style of the user."""
 
+# Localized default prompts, used when the user's language is detected
+LOCALIZED_SYSTEM_PROMPTS = {
+    "es": """Eres un asistente de WhatsApp. Responde de forma muy breve (1-2 frases).
+Responde con naturalidad, sé útil y mantén un tono amable. Responde en español.""",
+    "fr": """Tu es un assistant WhatsApp. Réponds très brièvement (1-2 phrases).
+Réponds naturellement, sois utile et garde un ton amical. Réponds en français.""",
+    "de": """Du bist ein WhatsApp-Assistent. Antworte sehr knapp (1-2 Sätze).
+Antworte natürlich, sei hilfsbereit und bleib freundlich. Antworte auf Deutsch.""",
+    "pt": """Você é um assistente do WhatsApp. Responda de forma muito breve (1-2 frases).
+Responda com naturalidade, seja útil e mantenha um tom simpático. Responda em português.""",
+    "it": """Sei un assistente WhatsApp. Rispondi in modo molto conciso (1-2 frasi).
+Rispondi con naturalezza, sii utile e mantieni un tono cordiale. Rispondi in italiano.""",
+    "ar": """أنت مساعد واتساب. اجعل ردودك قصيرة جداً (جملة أو جملتان).
+رد بشكل طبيعي ومفيد وبأسلوب ودود. رد باللغة العربية.""",
+    "ur": """آپ ایک واٹس ایپ اسسٹنٹ ہیں۔ جواب بہت مختصر رکھیں (1-2 جملے)۔
+فطری انداز میں، مددگار اور دوستانہ لہجے میں جواب دیں۔ اردو میں جواب دیں۔""",
+    "ur-Latn": """Aap ek WhatsApp assistant hain. Jawab bohat mukhtasar rakhein (1-2 jumlay).
+Naturally, helpful aur friendly andaaz mein jawab dein. Roman Urdu mein jawab dein.""",
+    "hi": """आप एक WhatsApp सहायक हैं। जवाब बहुत छोटा रखें (1-2 वाक्य)।
+स्वाभाविक, मददगार और दोस्ताना लहजे में जवाब दें। हिंदी में जवाब दें।""",
+}
+
 # JavaScript Selectors
 INPUT_SELECTORS = [
     'div[contenteditable="true"][data-testid="conversation-compose-box-input"]',
@@ -0,0 +1,33 @@
+"""Process statistics helpers for memory reporting"""
+import os
+
+
+def get_process_rss(pid=None):
+    """Return the resident set size of a process in bytes, or None if unavailable"""
+    if pid is None:
+        pid = os.getpid()
+    if not pid:
+        return None
+
+    # Linux exposes RSS directly in /proc
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # Fall back to psutil on other platforms when it is installed
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def format_bytes(value):
+    """Format a byte count as a short human readable string"""
+    if value is None:
+        return "n/a"
+    return f"{value / (1024 * 1024):.1f} MB"
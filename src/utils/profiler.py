@@ -0,0 +1,167 @@
+"""Runtime CPU sampling, tracemalloc snapshots and RSS tracking"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from src.utils.constants import (
+    PROFILE_SAMPLE_INTERVAL, PROFILE_SNAPSHOT_INTERVAL, PROFILE_RSS_INTERVAL,
+    PROFILE_MAX_STACK_DEPTH, PROFILE_TRACEMALLOC_FRAMES
+)
+from src.utils.process_stats import get_process_rss
+
+# Top frames of threads that are blocked, used when CPU time is unavailable
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("main.py", "main"),  # GUI thread inside app.exec()
+}
+
+class RuntimeProfiler:
+    """Background profiler writing files for standard tools.
+
+    Each session writes to its own directory:
+    - cpu.folded: sampled stacks of Python threads that used CPU since the
+      previous sample, in collapsed format, loadable in flamegraph.pl,
+      speedscope or inferno
+    - heap_<n>.tracemalloc: snapshots loadable with tracemalloc.Snapshot.load
+    - rss.csv: RSS of the Python process and each renderer process
+    """
+
+    def __init__(self, output_dir, renderer_pids=None):
+        self.output_dir = output_dir
+        self.renderer_pids = renderer_pids  # Callable returning {name: pid}
+        self.session_dir = None
+        self.samples = Counter()
+        self.sample_count = 0
+        self.snapshot_count = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread_cpu = {}  # thread id -> CPU time at the previous sample
+        self.started_tracemalloc = False
+
+    @property
+    def is_running(self):
+        """Return True while a profiling session is active"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start a new profiling session, returns the session directory"""
+        if self.is_running:
+            return self.session_dir
+
+        self.session_dir = os.path.join(self.output_dir, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.samples = Counter()
+        self.sample_count = 0
+        self.snapshot_count = 0
+        self.thread_cpu = {}
+        self.stop_event.clear()
+
+        # Leave tracing alone if it was already on (e.g. PYTHONTRACEMALLOC)
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        with open(self._path("rss.csv"), "w") as rss_file:
+            rss_file.write("time,process,rss_bytes\n")
+
+        self.thread = threading.Thread(target=self._run, name="RuntimeProfiler", daemon=True)
+        self.thread.start()
+        return self.session_dir
+
+    def stop(self):
+        """Stop the session and write the final output files"""
+        if not self.is_running:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self._write_snapshot()
+        self._write_cpu_profile()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def _path(self, name):
+        return os.path.join(self.session_dir, name)
+
+    def _run(self):
+        """Sample stacks and periodically record RSS and heap snapshots"""
+        next_rss = 0
+        next_snapshot = time.time() + PROFILE_SNAPSHOT_INTERVAL
+        while not self.stop_event.wait(PROFILE_SAMPLE_INTERVAL):
+            self._sample_stacks()
+            now = time.time()
+            if now >= next_rss:
+                self._record_rss(now)
+                next_rss = now + PROFILE_RSS_INTERVAL
+            if now >= next_snapshot:
+                self._write_snapshot()
+                # Flush CPU samples too so a crash does not lose them
+                self._write_cpu_profile()
+                next_snapshot = now + PROFILE_SNAPSHOT_INTERVAL
+
+    def _used_cpu(self, thread_id, frame):
+        """Return True if a thread used CPU since the previous sample"""
+        try:
+            cpu_time = time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+        except (AttributeError, OSError, OverflowError):
+            # No per-thread CPU clocks (Windows): skip threads parked in a wait
+            code = frame.f_code
+            return (os.path.basename(code.co_filename), code.co_name) not in IDLE_FRAMES
+        previous = self.thread_cpu.get(thread_id)
+        self.thread_cpu[thread_id] = cpu_time
+        return previous is not None and cpu_time > previous
+
+    def _sample_stacks(self):
+        """Record the current stack of every other Python thread that is on CPU"""
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or not self._used_cpu(thread_id, frame):
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_STACK_DEPTH:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            key = ";".join(part.replace(";", ":") for part in reversed(stack))
+            with self.lock:
+                self.samples[key] += 1
+                self.sample_count += 1
+
+    def _record_rss(self, now):
+        """Append the RSS of the Python and renderer processes"""
+        rows = [("python", get_process_rss())]
+        if self.renderer_pids:
+            try:
+                pids = self.renderer_pids()
+            except Exception:
+                pids = {}
+            for name, pid in pids.items():
+                rows.append((f"renderer:{name}", get_process_rss(pid)))
+        with open(self._path("rss.csv"), "a") as rss_file:
+            for name, rss in rows:
+                if rss is not None:
+                    rss_file.write(f"{now:.3f},{name},{rss}\n")
+
+    def _write_snapshot(self):
+        """Dump a tracemalloc snapshot"""
+        if not tracemalloc.is_tracing():
+            return
+        self.snapshot_count += 1
+        tracemalloc.take_snapshot().dump(self._path(f"heap_{self.snapshot_count:03d}.tracemalloc"))
+
+    def _write_cpu_profile(self):
+        """Write the sampled stacks in collapsed flamegraph format"""
+        with self.lock:
+            lines = [f"{stack} {count}\n" for stack, count in self.samples.items()]
+        with open(self._path("cpu.folded"), "w") as folded_file:
+            folded_file.writelines(lines)